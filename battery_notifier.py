@@ -6,70 +6,35 @@ Battery Notifier for Windows 11 — Headless with Tkinter Messagebox
 - To open settings, run with --settings from the command line.
 """
 
-import os, sys, subprocess, json, time, threading, datetime
-import tkinter as tk
-from tkinter import messagebox, ttk
+import os, sys, time, threading, ctypes, uuid
+from types import SimpleNamespace
+
+# Prefer orjson for settings I/O when it is installed; both paths are bytes in, bytes out.
+try:
+    import orjson as _json
+    _loads = _json.loads
+    _dumps = lambda o: _json.dumps(o, option=_json.OPT_INDENT_2)
+except ImportError:
+    import json as _json
+    _loads = _json.loads
+    _dumps = lambda o: _json.dumps(o, indent=2).encode()
 
-# --- Bootstrap Dependencies ---
 APP_NAME = "Battery Notifier"
 APP_VERSION = "1.0.0"
 APP_DIR = os.path.join(os.getenv("APPDATA") or "", "BatteryNotifier")
+
+# Dependencies are installed here once by bootstrap.py.
 VENDOR_DIR = os.path.join(APP_DIR, "_vendor")
-os.makedirs(VENDOR_DIR, exist_ok=True)
 if VENDOR_DIR not in sys.path:
     sys.path.insert(0, VENDOR_DIR)
 
-REQUIRED = {"psutil": "5.9.8"}
-
-def _need_bootstrap():
-    try:
-        __import__("psutil")
-        return False
-    except ImportError:
-        return True
-
-def _ensure_pip():
-    try:
-        import pip
-        return True
-    except ImportError:
-        try:
-            import ensurepip
-            ensurepip.bootstrap(upgrade=True)
-            return True
-        except Exception:
-            return False
-
-def _bootstrap_vendor():
-    if not _ensure_pip():
-        raise RuntimeError("Unable to bootstrap pip (ensurepip failed).")
-    py = sys.executable or "python"
-    for name, ver in REQUIRED.items():
-        try:
-            __import__(name)
-        except ImportError:
-            args = [
-                py, "-m", "pip", "install",
-                f"{name}=={ver}",
-                "--no-warn-script-location",
-                "--disable-pip-version-check",
-                "--target", VENDOR_DIR,
-            ]
-            subprocess.check_call(args)
-
-if _need_bootstrap():
-    try:
-        _bootstrap_vendor()
-    except Exception as e:
-        root = tk.Tk(); root.withdraw()
-        messagebox.showerror("Battery Notifier", f"First-run setup failed:\n{e}")
-        sys.exit(1)
-
-import psutil
-
 # --- Static Settings (No UI) ---
 SETTINGS_PATH = os.path.join(APP_DIR, "settings.json")
-STARTUP_SHORTCUT_PATH = os.path.join(os.environ.get("APPDATA") or "", "Microsoft", "Windows", "Start Menu", "Programs", "Startup", f"{APP_NAME}.lnk")
+# Named so a --settings process can wake the running notifier.
+SETTINGS_EVENT_NAME = "Local\\BatteryNotifierSettings"
+RUN_KEY_PATH = r"Software\Microsoft\Windows\CurrentVersion\Run"
+# Startup-folder shortcut written by versions before the Run key was used.
+LEGACY_STARTUP_SHORTCUT_PATH = os.path.join(os.environ.get("APPDATA") or "", "Microsoft", "Windows", "Start Menu", "Programs", "Startup", f"{APP_NAME}.lnk")
 
 DEFAULTS = {
     "low_threshold": 20,
@@ -79,18 +44,16 @@ DEFAULTS = {
 }
 
 def ensure_app_dir():
-    if APP_DIR and not os.path.isdir(APP_DIR):
+    if APP_DIR:
         os.makedirs(APP_DIR, exist_ok=True)
 
 def load_settings():
     ensure_app_dir()
-    data = {}
-    if os.path.isfile(SETTINGS_PATH):
-        try:
-            with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
+    try:
+        with open(SETTINGS_PATH, "rb") as f:
+            data = _loads(f.read())
+    except (OSError, ValueError):
+        data = {}
     cfg = DEFAULTS.copy()
     for k, v in data.items():
         if k in cfg:
@@ -99,21 +62,77 @@ def load_settings():
 
 def save_settings(s):
     ensure_app_dir()
-    with open(SETTINGS_PATH, "w", encoding="utf-8") as f:
-        json.dump(s, f, indent=2)
+    # Write a sibling file and swap it in, so a crash never leaves a half-written settings.json.
+    tmp = SETTINGS_PATH + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_dumps(s))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, SETTINGS_PATH)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+SETTINGS = SimpleNamespace(**load_settings())
+
+def reload_settings_if_changed(state):
+    """Re-reads settings.json when its mtime moves, e.g. after a --settings process saved it."""
+    try:
+        mtime = os.stat(SETTINGS_PATH).st_mtime_ns
+    except OSError:
+        mtime = None
+    if mtime != state["settings_mtime"]:
+        state["settings_mtime"] = mtime
+        vars(SETTINGS).update(load_settings())
+
+def notify_settings_changed():
+    """Signals the running notifier's settings event, if there is one."""
+    if sys.platform != "win32": return
+    EVENT_MODIFY_STATE = 0x0002
+    kernel32 = ctypes.WinDLL("kernel32")
+    kernel32.OpenEventW.restype = ctypes.c_void_p
+    kernel32.OpenEventW.argtypes = [ctypes.c_uint32, ctypes.c_int, ctypes.c_wchar_p]
+    kernel32.SetEvent.argtypes = [ctypes.c_void_p]
+    kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+    handle = kernel32.OpenEventW(EVENT_MODIFY_STATE, False, SETTINGS_EVENT_NAME)
+    if handle:
+        kernel32.SetEvent(handle)
+        kernel32.CloseHandle(handle)
 
-SETTINGS = load_settings()
+_tk_root = None
+_tk_lock = threading.Lock()
+
+def get_tk_root():
+    """Returns the shared hidden Tk root, creating it on first use."""
+    global _tk_root
+    with _tk_lock:
+        if _tk_root is None:
+            import tkinter as tk
+            _tk_root = tk.Tk()
+            _tk_root.withdraw()
+        return _tk_root
+
+def destroy_tk_root():
+    """Tk must be torn down on the thread that created it, so the owner calls this before exiting."""
+    global _tk_root
+    with _tk_lock:
+        if _tk_root is not None:
+            _tk_root.destroy()
+            _tk_root = None
 
 def show_notification_messagebox(title: str, message: str):
-    root = tk.Tk()
-    root.withdraw()
-    messagebox.showinfo(title, message)
-    root.destroy()
+    from tkinter import messagebox
+    messagebox.showinfo(title, message, parent=get_tk_root())
 
 def open_settings_window():
-    import win32com.client
+    import tkinter as tk
+    from tkinter import messagebox, ttk
     s = load_settings()
-    root = tk.Tk()
+    root = tk.Toplevel(get_tk_root())
     root.title(f"{APP_NAME} Settings")
     root.resizable(False, False)
     win_w, win_h = 420, 250
@@ -150,91 +169,420 @@ def open_settings_window():
                 else:
                     disable_auto_startup()
 
-            save_settings(s)
-            SETTINGS.update(s)
+            vars(SETTINGS).update(s)
+            save_settings(vars(SETTINGS))
+            notify_settings_changed()
             root.destroy()
         except tk.TclError:
-            messagebox.showerror("Invalid Input", "Please enter valid numbers.")
+            messagebox.showerror("Invalid Input", "Please enter valid numbers.", parent=root)
         except Exception as ex:
-            messagebox.showerror("Error", f"An error occurred while saving settings: {ex}")
+            messagebox.showerror("Error", f"An error occurred while saving settings: {ex}", parent=root)
 
     btns = ttk.Frame(root); btns.grid(row=4, column=0, columnspan=2, pady=(8,10))
     ttk.Button(btns, text="Save", command=save_and_close).grid(row=0, column=0, padx=6)
     ttk.Button(btns, text="Cancel", command=root.destroy).grid(row=0, column=1, padx=6)
-    root.mainloop()
+    root.wait_window()
+
+def _remove_legacy_shortcut():
+    try:
+        os.remove(LEGACY_STARTUP_SHORTCUT_PATH)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Failed to remove legacy startup shortcut: {e}")
 
 def enable_auto_startup():
-    import win32com.client
     if sys.platform != "win32": return
+    _remove_legacy_shortcut()
+    import winreg
     try:
-        shell = win32com.client.Dispatch("WScript.Shell")
-        shortcut = shell.CreateShortCut(STARTUP_SHORTCUT_PATH)
-        shortcut.Targetpath = sys.executable
-        shortcut.Arguments = f'"{os.path.abspath(sys.argv[0])}"'
-        shortcut.WorkingDirectory = os.path.dirname(os.path.abspath(sys.argv[0]))
-        shortcut.save()
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, RUN_KEY_PATH, 0, winreg.KEY_SET_VALUE) as key:
+            winreg.SetValueEx(key, APP_NAME, 0, winreg.REG_SZ, f'"{sys.executable}" "{os.path.abspath(sys.argv[0])}"')
     except Exception as e:
         print(f"Failed to enable auto-startup: {e}")
 
 def disable_auto_startup():
     if sys.platform != "win32": return
+    _remove_legacy_shortcut()
+    import winreg
     try:
-        if os.path.exists(STARTUP_SHORTCUT_PATH):
-            os.remove(STARTUP_SHORTCUT_PATH)
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, RUN_KEY_PATH, 0, winreg.KEY_SET_VALUE) as key:
+            winreg.DeleteValue(key, APP_NAME)
+    except FileNotFoundError:
+        pass
     except Exception as e:
         print(f"Failed to disable auto-startup: {e}")
 
-def main_loop():
-    last_alert = None
-    
-    while True:
-        try:
-            batt = psutil.sensors_battery()
-            if batt is None:
-                time.sleep(10)
-                continue
+# --- Power Notifications ---
+WM_POWERBROADCAST = 0x0218
+WM_WTSSESSION_CHANGE = 0x02B1
+PBT_APMPOWERSTATUSCHANGE = 0x000A
+PBT_APMRESUMEAUTOMATIC = 0x0012
+PBT_POWERSETTINGCHANGE = 0x8013
+WTS_SESSION_LOCK = 0x7
+WTS_SESSION_UNLOCK = 0x8
+NOTIFY_FOR_THIS_SESSION = 0
+WM_QUIT = 0x0012
+CTRL_C_EVENT = 0
+CTRL_BREAK_EVENT = 1
+DEVICE_NOTIFY_WINDOW_HANDLE = 0
+HWND_MESSAGE = -3
+GUID_BATTERY_PERCENTAGE_REMAINING = uuid.UUID("a7ad8041-b45a-4cae-87a3-eecbb468a9e1").bytes_le
+GUID_ACDC_POWER_SOURCE = uuid.UUID("5d3e9a59-e9d5-4b00-a6bd-ff34ff516548").bytes_le
 
-            current_percent = int(round(batt.percent))
-            current_charging = bool(batt.power_plugged)
-            
-            if not current_charging and current_percent <= SETTINGS["low_threshold"]:
-                if last_alert != "low":
-                    show_notification_messagebox(
-                        f"Battery Low: {current_percent}%", 
-                        "Please connect your charger."
-                    )
-                    last_alert = "low"
-            elif current_charging and current_percent >= SETTINGS["high_threshold"]:
-                if last_alert != "high":
-                    show_notification_messagebox(
-                        f"Battery High: {current_percent}%", 
-                        "You can unplug the charger."
-                    )
-                    last_alert = "high"
-            else:
-                last_alert = None
+# Floor between psutil battery queries, however often callers ask.
+_BATT_MIN_INTERVAL = 5.0
+_batt_cache = {"t": 0.0, "val": None}
+
+def _get_battery():
+    now = time.monotonic()
+    if now - _batt_cache["t"] < _BATT_MIN_INTERVAL and _batt_cache["val"] is not None:
+        return _batt_cache["val"]
+    import psutil
+    val = psutil.sensors_battery()
+    _batt_cache.update(t=now, val=val)
+    return val
+
+def refresh_battery(state):
+    batt = _get_battery()
+    if batt is None:
+        return False
+    state["percent"] = batt.percent
+    # power_plugged is already a bool, or None when it cannot be determined.
+    state["plugged"] = batt.power_plugged
+    return True
+
+# Worst-case rates (percent per second) assumed when scheduling the next poll.
+DRAIN_RATE = 1 / 60
+CHARGE_RATE = 1 / 120
+MAX_POLL_SECONDS = 30 * 60
+RATE_SMOOTHING = 0.5
+
+def track_rate(state):
+    """Keeps a short EMA of the observed charge/drain rate in percent per second."""
+    percent, plugged = state["percent"], state["plugged"]
+    if plugged != state["last_plugged"]:
+        state["rate"] = None
+    elif percent == state["last_percent"]:
+        return
+    elif state["last_time"] is not None:
+        now = time.monotonic()
+        rate = abs(percent - state["last_percent"]) / max(1e-3, now - state["last_time"])
+        state["rate"] = rate if state["rate"] is None else state["rate"] + RATE_SMOOTHING * (rate - state["rate"])
+    state.update(last_percent=percent, last_plugged=plugged, last_time=time.monotonic())
+
+def get_limits():
+    """Returns (low, high, poll_seconds); read once per wake and passed down."""
+    try:
+        poll_seconds = max(5, int(SETTINGS.poll_seconds))
+    except (TypeError, ValueError):
+        poll_seconds = DEFAULTS["poll_seconds"]
+    return (SETTINGS.low_threshold, SETTINGS.high_threshold, poll_seconds)
+
+# poll_seconds is stretched by this factor while on battery or with the session locked.
+SLOW_POLL_MULTIPLIER = 5
+
+def update_poll_multiplier(state):
+    slow = state["locked"] or not state["plugged"]
+    state["poll_multiplier"] = SLOW_POLL_MULTIPLIER if slow else 1
+
+def next_poll_seconds(state, limits):
+    """Sleeps until the earliest moment a threshold could be crossed.
+
+    The result is capped at MAX_POLL_SECONDS but never drops below the
+    (possibly multiplied) poll_seconds floor; the floor wins if they clash.
+    """
+    low, high, floor = limits
+    floor = max(5, floor * state["poll_multiplier"])
+    percent = state["percent"]
+    if percent is None:
+        return floor
+    drain, charge = DRAIN_RATE, CHARGE_RATE
+    if state["rate"]:
+        if state["plugged"]:
+            charge = max(charge, state["rate"])
+        else:
+            drain = max(drain, state["rate"])
+    # Both thresholds count: the charger can be (un)plugged at any time.
+    wait = min(
+        max(0, percent - low) / drain,
+        max(0, high - percent) / charge,
+    )
+    return int(max(floor, min(wait, MAX_POLL_SECONDS)))
+
+ALERT_MESSAGES = {
+    "low": ("Battery Low: {:.0f}%", "Please connect your charger."),
+    "high": ("Battery High: {:.0f}%", "You can unplug the charger."),
+}
+
+def classify_battery(pct, charging, low, high):
+    """Returns the alert a reading calls for: "low", "high" or None."""
+    return "low" if (not charging and pct <= low) else ("high" if (charging and pct >= high) else None)
+
+def check_battery(state, limits):
+    low, high, _ = limits
+    pct = state["percent"]
+    charging = state["plugged"]
+
+    # Same reading against the same thresholds cannot change the outcome.
+    sample = (charging, pct, low, high)
+    if sample == state["sample"]:
+        return
+    state["sample"] = sample
+
+    alert = classify_battery(pct, charging, low, high)
+    if alert is None:
+        state["last_alert"] = None
+    elif alert != state["last_alert"]:
+        state["last_alert"] = alert
+        title, message = ALERT_MESSAGES[alert]
+        show_notification_messagebox(title.format(pct), message)
+
+def evaluate(state, limits, refresh=False):
+    try:
+        if refresh or state["percent"] is None or state["plugged"] is None:
+            if not refresh_battery(state):
+                return False
+        track_rate(state)
+        update_poll_multiplier(state)
+        check_battery(state, limits)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    return True
+
+def reset_after_resume(state):
+    """Forgets everything learned before a suspend so the next reading is judged from scratch."""
+    _batt_cache["val"] = None
+    state.update(last_alert=None, sample=None, last_time=None, rate=None)
+
+def _read_power_setting(lparam):
+    """Returns (guid, value) from a POWERBROADCAST_SETTING pointer."""
+    guid = ctypes.string_at(lparam, 16)
+    length = ctypes.c_uint32.from_address(lparam + 16).value
+    if length < 4:
+        return guid, None
+    return guid, ctypes.c_uint32.from_address(lparam + 20).value
+
+# _wake cuts the current sleep short; _stop ends the loop.
+_wake = threading.Event()
+_stop = threading.Event()
+# Win32 event handles the poll thread waits on, and the thread pumping the
+# notification window; set by event_loop().
+_power_evt = None
+_settings_evt = None
+_pump_thread_id = None
+
+def wake_loops():
+    """Cuts the current wait short in whichever loop is running."""
+    _wake.set()
+    if _power_evt is not None:
+        import win32event
+        win32event.SetEvent(_power_evt)
+
+def next_wait_seconds(state, limits, have_reading):
+    """next_poll_seconds for the loops; a bad value in settings.json must not kill the loop."""
+    if not have_reading:
+        return 10
+    try:
+        return next_poll_seconds(state, limits)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return DEFAULTS["poll_seconds"]
+
+def _sleep(seconds):
+    _wake.wait(timeout=seconds)
+    _wake.clear()
+
+# --- WMI Battery Events ---
+WMI_BATTERY_QUERY = "SELECT * FROM __InstanceModificationEvent WITHIN 30 WHERE TargetInstance ISA 'Win32_Battery'"
+WMI_DISCHARGING = (1, 4, 5)  # Win32_Battery.BatteryStatus: Other/discharging, Low, Critical
+
+# Holds the WMI sink for the life of the pump; dropping the reference ends the subscription.
+_wmi_sink = None
+
+def subscribe_wmi_battery(on_change):
+    """Asynchronously watches Win32_Battery and calls on_change(percent, plugged).
+
+    Events are delivered through the calling thread's message pump. Keep the
+    returned sink referenced for as long as events are wanted.
+    """
+    import win32com.client
+
+    class _BatterySink:
+        def OnObjectReady(self, event, context):
+            batt = event.TargetInstance
+            on_change(batt.EstimatedChargeRemaining, batt.BatteryStatus not in WMI_DISCHARGING)
+
+    sink = win32com.client.DispatchWithEvents("WbemScripting.SWbemSink", _BatterySink)
+    win32com.client.GetObject("winmgmts:").ExecNotificationQueryAsync(sink, WMI_BATTERY_QUERY)
+    return sink
+
+def poll_loop(state):
+    while not _stop.is_set():
+        # One stat per wake picks up changes saved by a separate --settings process.
+        reload_settings_if_changed(state)
+        limits = get_limits()
+        if not evaluate(state, limits, refresh=True):
+            _sleep(10)
+            continue
+        delay = next_wait_seconds(state, limits, True)
+        started = time.monotonic()
+        _sleep(delay)
+        # Oversleeping by more than a whole poll interval means the machine was suspended.
+        if time.monotonic() - started > delay + limits[2]:
+            reset_after_resume(state)
+
+def wait_loop(state):
+    """Poll thread body: checks the battery, then parks until a power event, a settings change or the next poll is due."""
+    import win32event
+    handles = [_power_evt, _settings_evt]
+    refresh = True
+    try:
+        while not _stop.is_set():
+            # pop() takes each flag atomically, so a request made meanwhile is kept for the next pass.
+            if state.pop("resumed", False):
+                reset_after_resume(state)
+            refresh = state.pop("refresh", False) or refresh
+            reload_settings_if_changed(state)
+            limits = get_limits()
+            timeout = next_wait_seconds(state, limits, evaluate(state, limits, refresh=refresh))
+            rc = win32event.WaitForMultipleObjects(handles, False, timeout * 1000)
+            refresh = rc == win32event.WAIT_TIMEOUT
+    finally:
+        # Notifications created the Tk root on this thread, so it has to go away here too.
+        destroy_tk_root()
+
+def event_loop(state):
+    """Owns the power notification window and pumps its messages; battery checks run on a daemon thread."""
+    global _power_evt, _settings_evt, _pump_thread_id, _wmi_sink
+    import win32api, win32event, win32gui
+
+    user32 = ctypes.WinDLL("user32")
+    user32.RegisterPowerSettingNotification.restype = ctypes.c_void_p
+    user32.RegisterPowerSettingNotification.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_uint32]
+    wtsapi32 = ctypes.WinDLL("wtsapi32")
+    wtsapi32.WTSRegisterSessionNotification.argtypes = [ctypes.c_void_p, ctypes.c_uint32]
+
+    _power_evt = win32event.CreateEvent(None, False, False, None)
+    _settings_evt = win32event.CreateEvent(None, False, False, SETTINGS_EVENT_NAME)
+
+    def signal_power(refresh=False):
+        if refresh:
+            _batt_cache["val"] = None
+            state["refresh"] = True
+        win32event.SetEvent(_power_evt)
+
+    def on_power(hwnd, msg, wparam, lparam):
+        if wparam == PBT_POWERSETTINGCHANGE:
+            guid, value = _read_power_setting(lparam)
+            if value is not None:
+                if guid == GUID_BATTERY_PERCENTAGE_REMAINING:
+                    state["percent"] = value
+                elif guid == GUID_ACDC_POWER_SOURCE:
+                    state["plugged"] = value == 0  # 0 = AC, 1 = DC, 2 = UPS
+                signal_power()
+        elif wparam == PBT_APMPOWERSTATUSCHANGE:
+            signal_power(refresh=True)
+        elif wparam == PBT_APMRESUMEAUTOMATIC:
+            state["resumed"] = True
+            signal_power(refresh=True)
+        return True
+
+    def on_session(hwnd, msg, wparam, lparam):
+        if wparam in (WTS_SESSION_LOCK, WTS_SESSION_UNLOCK):
+            state["locked"] = wparam == WTS_SESSION_LOCK
+            # Unlocking speeds polling back up, so take a fresh reading right away.
+            signal_power(refresh=not state["locked"])
+        return 0
+
+    wc = win32gui.WNDCLASS()
+    wc.hInstance = win32api.GetModuleHandle(None)
+    wc.lpszClassName = "BatteryNotifierPowerWindow"
+    wc.lpfnWndProc = {WM_POWERBROADCAST: on_power, WM_WTSSESSION_CHANGE: on_session}
+    class_atom = win32gui.RegisterClass(wc)
+    hwnd = win32gui.CreateWindow(class_atom, APP_NAME, 0, 0, 0, 0, 0, HWND_MESSAGE, 0, wc.hInstance, None)
+
+    registered = all([
+        user32.RegisterPowerSettingNotification(hwnd, guid, DEVICE_NOTIFY_WINDOW_HANDLE)
+        for guid in (GUID_BATTERY_PERCENTAGE_REMAINING, GUID_ACDC_POWER_SOURCE)
+    ])
+    wtsapi32.WTSRegisterSessionNotification(hwnd, NOTIFY_FOR_THIS_SESSION)
+    if not registered:
+        def on_wmi_change(percent, plugged):
+            state["percent"], state["plugged"] = percent, plugged
+            signal_power()
+
+        try:
+            _wmi_sink = subscribe_wmi_battery(on_wmi_change)
         except Exception as e:
-            print(f"An error occurred: {e}")
-            
-        time.sleep(max(5, int(SETTINGS.get("poll_seconds", 60))))
+            print(f"Battery events unavailable; falling back to polling: {e}")
+
+    _pump_thread_id = win32api.GetCurrentThreadId()
+
+    # The wait timeout in wait_loop is the safety net for machines that emit neither kind of event.
+    poller = threading.Thread(target=wait_loop, args=(state,), name="battery-poll", daemon=True)
+    poller.start()
+    win32gui.PumpMessages()
+    # Give the poll thread a chance to tear down its Tk root; a notification still on screen may hold it up.
+    _request_stop()
+    poller.join(timeout=5)
+
+def _request_stop():
+    _stop.set()
+    wake_loops()
+    if _pump_thread_id is not None:
+        ctypes.WinDLL("user32").PostThreadMessageW(_pump_thread_id, WM_QUIT, 0, 0)
+
+_console_ctrl_handler = None
+
+def install_stop_handler():
+    """Stops the loops on Ctrl+C / Ctrl+Break.
+
+    Python signal handlers only run on the main thread between bytecodes, which
+    never happens while it is parked in a lock wait or in GetMessage. A console
+    control handler runs on its own system thread, so it can cut either short.
+    """
+    global _console_ctrl_handler
+    if sys.platform != "win32": return
+
+    @ctypes.WINFUNCTYPE(ctypes.c_int, ctypes.c_uint32)
+    def handler(ctrl_type):
+        if ctrl_type not in (CTRL_C_EVENT, CTRL_BREAK_EVENT):
+            return False
+        _request_stop()
+        return True
+
+    _console_ctrl_handler = handler  # ctypes callbacks must outlive their registration
+    ctypes.WinDLL("kernel32").SetConsoleCtrlHandler(handler, True)
+
+def main_loop():
+    install_stop_handler()
+    state = {
+        "last_alert": None, "percent": None, "plugged": None,
+        "last_percent": None, "last_plugged": None, "last_time": None, "rate": None,
+        "sample": None, "settings_mtime": None, "locked": False, "poll_multiplier": 1,
+    }
+    if sys.platform == "win32":
+        try:
+            import win32gui
+        except ImportError:
+            pass
+        else:
+            return event_loop(state)
+    poll_loop(state)
 
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--settings":
         open_settings_window()
         sys.exit(0)
 
-    if SETTINGS["start_with_windows"]:
-        # Only bootstrap the auto-startup logic if running on Windows
-        try:
-            import win32com.client
-            enable_auto_startup()
-        except ImportError:
-            print("Auto-startup not supported without pywin32. Please install it with 'pip install pywin32'")
+    import importlib.util
+    if importlib.util.find_spec("psutil") is None:
+        sys.exit("psutil is not installed. Run 'python bootstrap.py' once.")
+
+    if SETTINGS.start_with_windows:
+        enable_auto_startup()
     else:
-        try:
-            import win32com.client
-            disable_auto_startup()
-        except ImportError:
-            pass
+        disable_auto_startup()
 
     main_loop()
\ No newline at end of file
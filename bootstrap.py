@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Battery Notifier first-run setup.
+- Installs the runtime dependencies into a private vendor directory under %AppData%.
+- Run once (e.g. from the installer) before starting battery_notifier.py.
+"""
+
+import os, sys, subprocess
+
+APP_DIR = os.path.join(os.getenv("APPDATA") or "", "BatteryNotifier")
+VENDOR_DIR = os.path.join(APP_DIR, "_vendor")
+
+REQUIRED = {"psutil": "5.9.8"}
+
+def _ensure_pip():
+    try:
+        import pip
+        return True
+    except ImportError:
+        try:
+            import ensurepip
+            ensurepip.bootstrap(upgrade=True)
+            return True
+        except Exception:
+            return False
+
+def _bootstrap_vendor():
+    if not _ensure_pip():
+        raise RuntimeError("Unable to bootstrap pip (ensurepip failed).")
+    py = sys.executable or "python"
+    for name, ver in REQUIRED.items():
+        try:
+            __import__(name)
+        except ImportError:
+            args = [
+                py, "-m", "pip", "install",
+                f"{name}=={ver}",
+                "--no-warn-script-location",
+                "--disable-pip-version-check",
+                "--target", VENDOR_DIR,
+            ]
+            subprocess.check_call(args)
+
+if __name__ == "__main__":
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    if VENDOR_DIR not in sys.path:
+        sys.path.insert(0, VENDOR_DIR)
+    try:
+        _bootstrap_vendor()
+    except Exception as e:
+        try:
+            import tkinter as tk
+            from tkinter import messagebox
+        except ImportError:
+            print(f"First-run setup failed:\n{e}")
+            sys.exit(1)
+        root = tk.Tk(); root.withdraw()
+        messagebox.showerror("Battery Notifier", f"First-run setup failed:\n{e}")
+        sys.exit(1)
\ No newline at end of file